@@ -4,12 +4,52 @@ import os
 import sys
 import argparse
 import threading
+import queue
 import time
 import hashlib
-import shutil
+import http.client
+import io
+import json
+import mmap
+import re
+import socket
 from urllib.parse import urlparse
 from pathlib import Path
+import blake3
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+# Unit of work for network reads and file writes. Large chunks
+# keep the number of Python-level loop iterations (and syscalls) per byte low.
+CHUNK_SIZE = 1024 * 1024
+
+# Multi-threaded downloads split the file into segments of this size. Threads
+# pull the next segment from a shared queue when they finish one, so a slow
+# connection only holds back the segment it is working on.
+SEGMENT_SIZE = 4 * 1024 * 1024
+
+# Segment threads wake the progress display every time they receive this
+# many bytes; the display also refreshes on its own if nothing arrives.
+PROGRESS_NOTIFY_SIZE = 256 * 1024
+
+# Hashed data is dropped from the page cache in steps of at least this size.
+# Dirty pages cannot be dropped, so each step first writes the file back to
+# disk; large steps keep those flushes rare.
+CACHE_DROP_SIZE = 32 * 1024 * 1024
+
+# Width of the progress bar and the minimum time between two redraws.
+BAR_LENGTH = 40
+PROGRESS_INTERVAL = 0.1
+
+# Hash algorithms offered for verification, with the names shown to the user.
+HASH_ALGORITHMS = {'blake3': 'BLAKE3', 'sha256': 'SHA-256'}
+
+# Content-Range header of a partial response: first byte, last byte, total size.
+CONTENT_RANGE_PATTERN = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+
+# Needed on Windows so os.open() does not translate line endings.
+O_BINARY = getattr(os, 'O_BINARY', 0)
 
 def get_download_path(directory=None):
     """
@@ -34,10 +74,110 @@ def get_filename_from_url(url):
     except Exception:
         return 'downloaded_file'
 
+def _preallocate(fd, size):
+    """
+    Reserves disk space for the whole file, falling back to a sparse resize.
+    Returns True if posix_fallocate succeeded. On copy-on-write filesystems
+    (btrfs, ZFS) later writes can still run out of space even then.
+    """
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(fd, 0, size)
+            return True
+        except OSError:
+            pass
+    os.ftruncate(fd, size)
+    return False
+
+def _write_at(fd, data, offset):
+    """Writes all of data at the given file offset without a shared file position."""
+    view = memoryview(data)
+    while view:
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+def _parse_content_range(value):
+    """Returns (first, last, total) from a Content-Range header, or None if it does not name a byte range."""
+    match = CONTENT_RANGE_PATTERN.fullmatch(value.strip())
+    if not match:
+        return None
+    return tuple(int(number) for number in match.groups())
+
+def _raw_body(response):
+    """
+    Returns the http.client response under a streamed requests response, whose
+    body can be read into a buffer with readinto(), or None if it is not there.
+    This relies on urllib3's private `_fp` attribute, so callers must be able
+    to fall back to iter_content().
+    """
+    raw = getattr(response.raw, '_fp', None)
+    if not hasattr(raw, 'readinto') or not hasattr(raw, 'isclosed'):
+        return None
+    return raw
+
+def _map_file(path):
+    """Maps a file into memory for writing, or returns None where that is not possible."""
+    try:
+        with open(path, 'r+b') as f:
+            return mmap.mmap(f.fileno(), 0)
+    except (OSError, ValueError, OverflowError):
+        return None
+
+def _advise_sequential(fd):
+    """Asks the kernel for aggressive readahead on a file that is read front to back once."""
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+def _unmap_pages(mm, start, end):
+    """Removes [start, end) from a mapping; the file keeps the data, and it is mapped again if touched."""
+    if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+        mm.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+def _drop_from_cache(fd, mm, start, end):
+    """
+    Releases the cached pages of [start, end), which have been hashed and will
+    not be read again. The kernel skips pages that are dirty or still mapped,
+    so the range must not be mapped elsewhere, and the file is written back first.
+    """
+    _unmap_pages(mm, start, end)
+    if hasattr(os, 'posix_fadvise'):
+        if hasattr(os, 'fdatasync'):
+            os.fdatasync(fd)
+        os.posix_fadvise(fd, start, end - start, os.POSIX_FADV_DONTNEED)
+
+def _new_hasher(algorithm):
+    """Creates a hash object for the given algorithm name."""
+    if algorithm == 'blake3':
+        # BLAKE3 is a tree hash: large updates are split across all CPU cores.
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    return hashlib.new(algorithm)
+
+class SocketOptionsAdapter(HTTPAdapter):
+    """HTTPAdapter that applies extra socket options to every connection it opens."""
+
+    def __init__(self, socket_options=None, **kwargs):
+        self.socket_options = socket_options
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.socket_options is not None:
+            kwargs['socket_options'] = self.socket_options
+        super().init_poolmanager(*args, **kwargs)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        if self.socket_options is not None:
+            proxy_kwargs['socket_options'] = self.socket_options
+        return super().proxy_manager_for(proxy, **proxy_kwargs)
+
 class Downloader:
     """Handles the file downloading logic for the CLI."""
 
-    def __init__(self, url, output_path, num_threads=8, retries=3):
+    def __init__(self, url, output_path, num_threads=8, retries=3, socket_buffer=None, hash_algorithm='blake3'):
         self.url = url
         self.output_path = output_path
         self.num_threads = num_threads
@@ -47,11 +187,52 @@ class Downloader:
         self.start_time = None
         self.stop_event = threading.Event()
         self.error_occurred = None
+        self._progress = []
+        self._resumed_bytes = 0
+        self._full_bar = '█' * BAR_LENGTH
+        self._empty_bar = '-' * BAR_LENGTH
+        self._last_draw = 0.0
+        self._progress_cv = threading.Condition()
+        self._done_count = 0
+        self.hash_algorithm = hash_algorithm
+        self._hasher = _new_hasher(hash_algorithm)
+        self._hash_error = None
+        self._hashed = 0
+        self._hash_lock = threading.Lock()
+        self._segments = []
+        self._pending_segments = queue.Queue()
+        self._file_map = None
+        self._file_view = None
+        self._worker_count = 0
+
+        # One pooled session for the HEAD and every range request, so TCP/TLS
+        # connections are reused instead of being set up per request.
+        # A fixed receive buffer turns off the kernel's own buffer autotuning,
+        # so it is only set when asked for (e.g. for long, fast links).
+        socket_options = None
+        if socket_buffer:
+            socket_options = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_RCVBUF, socket_buffer),
+            ]
+        self.session = requests.Session()
+        adapter = SocketOptionsAdapter(
+            socket_options=socket_options,
+            pool_connections=num_threads, pool_maxsize=num_threads, max_retries=0,
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
     def download(self):
         """Starts the download process."""
         try:
-            head = requests.head(self.url, allow_redirects=True, timeout=10)
+            self._download()
+        finally:
+            self.session.close()
+
+    def _download(self):
+        """Queries the server and picks the single- or multi-threaded mode."""
+        try:
+            head = self.session.head(self.url, allow_redirects=True, timeout=10)
             head.raise_for_status()
         except requests.exceptions.RequestException as e:
             print(f"Error: Failed to connect to the server: {e}")
@@ -67,20 +248,24 @@ class Downloader:
             print("Server does not support multi-threaded downloading. Using single-threaded mode.")
             self._single_threaded_download()
 
-    def _print_progress(self):
-        """Prints a progress bar to the console."""
+    def _print_progress(self, force=False):
+        """Prints a progress bar to stderr, at most once per PROGRESS_INTERVAL unless forced."""
         if self.stop_event.is_set():
             return
 
+        now = time.time()
+        if not force and now - self._last_draw < PROGRESS_INTERVAL:
+            return
+        self._last_draw = now
+
         percentage = 0
         if self.total_size > 0:
             percentage = (self.total_downloaded / self.total_size) * 100
 
-        bar_length = 40
-        filled_length = int(bar_length * self.total_downloaded // self.total_size) if self.total_size else 0
-        bar = '█' * filled_length + '-' * (bar_length - filled_length)
+        filled_length = int(BAR_LENGTH * self.total_downloaded // self.total_size) if self.total_size else 0
+        bar = self._full_bar[:filled_length] + self._empty_bar[filled_length:]
 
-        elapsed_time = time.time() - self.start_time
+        elapsed_time = now - self.start_time
         speed = self.total_downloaded / elapsed_time / 1024 if elapsed_time > 0 else 0  # KB/s
         
         eta = ""
@@ -88,12 +273,25 @@ class Downloader:
             remaining = (self.total_size - self.total_downloaded) / (speed * 1024)
             eta = f"ETA: {int(remaining // 60)}m {int(remaining % 60)}s"
 
-        sys.stdout.write(f"\r|{bar}| {percentage:.2f}% ({speed:.2f} KB/s) {eta}      ")
-        sys.stdout.flush()
+        line = f"\r|{bar}| {percentage:.2f}% ({speed:.2f} KB/s) {eta}      "
+        try:
+            os.write(sys.stderr.fileno(), line.encode(sys.stderr.encoding or 'utf-8', 'replace'))
+        except (OSError, ValueError, AttributeError, io.UnsupportedOperation):
+            # stderr replaced by an object without a file descriptor.
+            sys.stderr.write(line)
+            sys.stderr.flush()
 
     def _single_threaded_download(self):
         """Downloads the file using a single thread."""
         part_file = str(self.output_path) + '.part'
+        state_file = part_file + '.json'
+        if os.path.exists(state_file):
+            # Left over from a multi-threaded attempt: that .part file is
+            # preallocated to full size, not a prefix we can append to.
+            os.remove(state_file)
+            if os.path.exists(part_file):
+                os.remove(part_file)
+
         resume_pos = 0
         if os.path.exists(part_file):
             resume_pos = os.path.getsize(part_file)
@@ -103,18 +301,38 @@ class Downloader:
         self.start_time = time.time()
 
         try:
-            response = requests.get(self.url, headers=headers, stream=True, timeout=10)
+            response = self.session.get(self.url, headers=headers, stream=True, timeout=10)
             response.raise_for_status()
+            if resume_pos > 0:
+                content_range = _parse_content_range(response.headers.get('Content-Range', ''))
+                if response.status_code != 206 or content_range is None or content_range[0] != resume_pos:
+                    # Not the rest of the file, so start over from the first byte.
+                    resume_pos = 0
+                    self.total_downloaded = 0
+                    if response.status_code != 200:
+                        response.close()
+                        response = self.session.get(self.url, stream=True, timeout=10)
+                        response.raise_for_status()
+
+            if resume_pos > 0:
+                self._hash_file(part_file)
 
             mode = 'ab' if resume_pos > 0 else 'wb'
-            with open(part_file, mode) as f:
-                for chunk in response.iter_content(chunk_size=8192):
+            with open(part_file, mode, buffering=CHUNK_SIZE) as f:
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
                     if chunk:
+                        self._hasher.update(chunk)
+                        self._hashed += len(chunk)
                         f.write(chunk)
                         self.total_downloaded += len(chunk)
                         self._print_progress()
+                self._print_progress(force=True)
 
-            os.rename(part_file, self.output_path)
+            # Keep the partial file for a later resume if the body was cut short.
+            if self.total_size and self._hashed != self.total_size:
+                print(f"\nDownload error: only {self._hashed} of {self.total_size} bytes were received.")
+                return
+            os.replace(part_file, self.output_path)
             self._verify_file_integrity()
         except requests.exceptions.RequestException as e:
             print(f"\nDownload error: {e}")
@@ -123,110 +341,388 @@ class Downloader:
             self.stop_event.set()
 
     def _multi_threaded_download(self):
-        """Downloads the file using multiple threads."""
-        chunk_size = self.total_size // self.num_threads
-        segments = []
-        for i in range(self.num_threads):
-            start = i * chunk_size
-            end = start + chunk_size - 1 if i < self.num_threads - 1 else self.total_size - 1
-            segments.append((start, end))
-
-        lock = threading.Lock()
+        """Downloads the file using multiple threads writing into one preallocated file."""
+        part_file = str(self.output_path) + '.part'
+        state_file = part_file + '.json'
+
+        self._segments = self._load_segments(part_file, state_file)
+        if self._segments is None:
+            self._segments = []
+            for start in range(0, self.total_size, SEGMENT_SIZE):
+                end = min(start + SEGMENT_SIZE, self.total_size) - 1
+                self._segments.append([start, end, 0])
+            flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | O_BINARY
+        else:
+            flags = os.O_WRONLY | O_BINARY
+
+        # Also done when resuming, so holes left by an earlier sparse resize
+        # get reserved if the filesystem allows it now.
+        fd = os.open(part_file, flags, 0o644)
+        try:
+            reserved = _preallocate(fd, self.total_size)
+        finally:
+            os.close(fd)
+
+        self._resumed_bytes = 0
+        for index, (start, end, done) in enumerate(self._segments):
+            self._resumed_bytes += done
+            if done < end - start + 1:
+                self._pending_segments.put(index)
+
+        # Writing through a mapping into space the filesystem cannot back
+        # (disk full) raises SIGBUS instead of an OSError, killing the process
+        # without saving the resume state. A sparse file makes that likely, so
+        # it is only mapped after posix_fallocate succeeded. This lowers the
+        # risk but cannot remove it on copy-on-write filesystems, which may
+        # still need new blocks for data written into preallocated space.
+        if reserved:
+            self._file_map = _map_file(part_file)
+        if self._file_map is not None:
+            self._file_view = memoryview(self._file_map)
+
         threads = []
+        self._worker_count = min(self.num_threads, self._pending_segments.qsize())
+        # Bytes received by each worker in this run. Each slot is written only
+        # by its own worker, so no lock is needed; the main thread sums them.
+        self._progress = [0] * self._worker_count
         self.start_time = time.time()
 
-        for i, (start, end) in enumerate(segments):
-            thread = threading.Thread(target=self._download_segment, args=(i, start, end, lock))
+        hash_thread = threading.Thread(target=self._hash_while_downloading, args=(part_file,))
+        hash_thread.start()
+
+        for slot in range(self._worker_count):
+            thread = threading.Thread(target=self._run_worker, args=(part_file, slot))
             threads.append(thread)
             thread.start()
 
+        cancelled = True
         try:
-            while any(t.is_alive() for t in threads):
-                self._print_progress()
-                time.sleep(0.1)
-
+            with self._progress_cv:
+                while self._done_count < len(threads):
+                    self._progress_cv.wait(timeout=0.5)
+                    self._collect_progress()
+                    self._print_progress()
+            cancelled = False
+        except KeyboardInterrupt:
+            print("\nDownload cancelled by user. Waiting for segments to finish...")
+        finally:
+            # Also reached on an unexpected error: the workers must stop and
+            # the progress of their segments be saved before it propagates.
+            if cancelled:
+                self.stop_event.set()
             for thread in threads:
                 thread.join()
+            self._unmap_file()
+            if cancelled:
+                hash_thread.join()
+                self._save_segments(state_file)
 
-        except KeyboardInterrupt:
-            print("\nDownload cancelled by user. Waiting for segments to finish...")
-            self.stop_event.set()
-            for t in threads:
-                t.join()
+        if cancelled:
             print("Cancellation complete.")
             return
 
+        self._collect_progress()
+        self._print_progress(force=True)
+        hash_thread.join()
+        if not self.error_occurred and not self._is_complete():
+            if self._hash_error:
+                self.error_occurred = f"File verification error: {self._hash_error}"
+            else:
+                self.error_occurred = "Not every segment was fully downloaded."
+
         if not self.error_occurred:
-            self._merge_files()
+            print("\nDownload complete.")
+            os.replace(part_file, self.output_path)
+            if os.path.exists(state_file):
+                os.remove(state_file)
             self._verify_file_integrity()
         else:
+            self._save_segments(state_file)
             print(f"\nDownload failed due to an error: {self.error_occurred}")
 
+    def _is_complete(self):
+        """Checks that every segment was fully written and the hash covers the whole file."""
+        for start, end, done in self._segments:
+            if done < end - start + 1:
+                return False
+        return self._hashed == self.total_size
 
-    def _download_segment(self, index, start, end, lock):
-        """Downloads a single segment of the file."""
-        part_file = f"{self.output_path}.part{index}"
-        resume_pos = 0
-        if os.path.exists(part_file):
-            resume_pos = os.path.getsize(part_file)
-
-        with lock:
-            self.total_downloaded += resume_pos
-
-        if resume_pos >= (end - start + 1):
+    def _unmap_file(self):
+        """Closes the writable mapping of the output file once the segment threads are done."""
+        if self._file_map is None:
+            return
+        try:
+            self._file_view.release()
+            self._file_map.close()
+        except BufferError:
+            # A view of the mapping is still referenced somewhere; it is
+            # closed when garbage collected.
+            pass
+        self._file_map = self._file_view = None
+
+    def _drop_hashed(self, fd, mm, start, end):
+        """Drops a hashed range from the cache, after removing it from the segment threads' mapping too."""
+        file_map = self._file_map
+        if file_map is not None:
+            try:
+                _unmap_pages(file_map, start, end)
+            except ValueError:
+                # Closed by _unmap_file in the meantime.
+                pass
+        _drop_from_cache(fd, mm, start, end)
+
+    def _load_segments(self, part_file, state_file):
+        """Returns the segment list of an interrupted download, or None to start over."""
+        if not (os.path.exists(part_file) and os.path.exists(state_file)):
+            return None
+        try:
+            with open(state_file) as f:
+                state = json.load(f)
+            if not isinstance(state, dict) or state.get('total_size') != self.total_size:
+                return None
+            if os.path.getsize(part_file) != self.total_size:
+                return None
+            segments = state.get('segments')
+            if not isinstance(segments, list):
+                return None
+            # The segments must cover the file from front to back, without gaps.
+            next_start = 0
+            for segment in segments:
+                if not (isinstance(segment, list) and len(segment) == 3
+                        and all(type(value) is int for value in segment)):
+                    return None
+                start, end, done = segment
+                if not (start == next_start <= end < self.total_size and 0 <= done <= end - start + 1):
+                    return None
+                next_start = end + 1
+            if next_start != self.total_size:
+                return None
+        except (OSError, ValueError):
+            return None
+        return segments
+
+    def _save_segments(self, state_file):
+        """Records how far each segment got so the download can be resumed."""
+        with open(state_file, 'w') as f:
+            json.dump({'total_size': self.total_size, 'segments': self._segments}, f)
+
+    def _collect_progress(self):
+        """Sums the byte counts published by the segment threads into the total."""
+        self.total_downloaded = self._resumed_bytes + sum(self._progress)
+
+    def _notify_progress(self):
+        """Wakes the main thread and the hashing thread to look at the new progress."""
+        with self._progress_cv:
+            self._progress_cv.notify_all()
+
+    def _run_worker(self, part_file, slot):
+        """Thread entry point: downloads queued segments until none are left, then signals."""
+        try:
+            # Without a mapping of the file, data is received into this buffer
+            # and written out with pwrite; it is reused for every chunk.
+            buffer = None
+            if self._file_view is None:
+                buffer = memoryview(bytearray(CHUNK_SIZE))
+            fd = os.open(part_file, os.O_WRONLY | O_BINARY)
+            try:
+                while not self.stop_event.is_set() and not self.error_occurred:
+                    try:
+                        index = self._pending_segments.get_nowait()
+                    except queue.Empty:
+                        return
+                    self._download_segment(index, fd, buffer, slot)
+            finally:
+                os.close(fd)
+        finally:
+            with self._progress_cv:
+                self._done_count += 1
+                self._progress_cv.notify_all()
+
+    def _download_segment(self, index, fd, buffer, slot):
+        """Downloads a single segment straight into its range of the output file."""
+        start, end, done = self._segments[index]
+        received = done
+
+        if done >= (end - start + 1):
             return
-
-        current_start = start + resume_pos
-        headers = {'Range': f'bytes={current_start}-{end}'}
-        mode = 'ab' if resume_pos > 0 else 'wb'
 
         for attempt in range(self.retries):
             if self.stop_event.is_set():
                 return
             try:
-                response = requests.get(self.url, headers=headers, stream=True, timeout=10)
+                # A byte range of a compressed body cannot be decoded on its own.
+                headers = {'Range': f'bytes={start + received}-{end}', 'Accept-Encoding': 'identity'}
+                response = self.session.get(self.url, headers=headers, stream=True, timeout=10)
                 response.raise_for_status()
-
-                with open(part_file, mode) as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if self.stop_event.is_set():
-                            return
-                        if chunk:
-                            f.write(chunk)
-                            with lock:
-                                self.total_downloaded += len(chunk)
+                # Data is written at absolute offsets, so anything other than
+                # the exact range asked for, of a file of the expected size,
+                # would corrupt the file.
+                content_range = _parse_content_range(response.headers.get('Content-Range', ''))
+                if response.status_code != 206 or content_range != (start + received, end, self.total_size):
+                    response.close()
+                    raise requests.exceptions.HTTPError(
+                        f"Server did not return the requested range (HTTP {response.status_code})",
+                        response=response,
+                    )
+
+                unreported = 0
+                for offset, chunk in self._receive(response, fd, buffer, start + received, end):
+                    if self.stop_event.is_set():
+                        return
+                    received += len(chunk)
+                    self._segments[index][2] = received
+                    self._progress[slot] += len(chunk)
+                    if offset == self._hashed:
+                        self._hash_in_order(chunk, offset)
+                    unreported += len(chunk)
+                    if unreported >= PROGRESS_NOTIFY_SIZE:
+                        self._notify_progress()
+                        unreported = 0
                 break
-            except requests.exceptions.RequestException as e:
+            except (requests.exceptions.RequestException, http.client.HTTPException, OSError) as e:
                 if attempt < self.retries - 1:
                     time.sleep(2 ** attempt)
                 else:
-                    with lock:
-                        self.error_occurred = f"Failed to download segment {index}: {e}"
+                    self.error_occurred = f"Failed to download segment {index}: {e}"
                     return
 
-    def _merge_files(self):
-        """Merges the downloaded segments into a single file."""
-        print("\nDownload complete. Merging files...")
-        with open(self.output_path, 'wb') as f_out:
-            for i in range(self.num_threads):
-                part_file = f"{self.output_path}.part{i}"
-                if os.path.exists(part_file):
-                    with open(part_file, 'rb') as f_in:
-                        shutil.copyfileobj(f_in, f_out)
-                    os.remove(part_file)
+    def _receive(self, response, fd, buffer, offset, end):
+        """
+        Stores the body of a range response in the output file from `offset` on,
+        yielding (offset, chunk) for each piece once it is in place. Bodies
+        without a content encoding are read straight into the memory-mapped
+        file, so socket data is copied once, into the file's pages, with no
+        intermediate bytes objects. Without a mapping they are read into the
+        worker's reusable buffer and written out with pwrite.
+        """
+        raw = _raw_body(response)
+        encoded = response.headers.get('Content-Encoding', 'identity') != 'identity'
+        if raw is None or encoded:
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if not chunk:
+                    continue
+                # Never write past the segment, even if the server sends more.
+                overrun = len(chunk) > end + 1 - offset
+                if overrun:
+                    chunk = chunk[:end + 1 - offset]
+                if chunk:
+                    _write_at(fd, chunk, offset)
+                    yield offset, chunk
+                    offset += len(chunk)
+                if overrun:
+                    response.close()
+                    break
+            return
+
+        while offset <= end:
+            size = min(CHUNK_SIZE, end + 1 - offset)
+            if self._file_view is not None:
+                target = self._file_view[offset:offset + size]
+            else:
+                target = buffer[:size]
+            n = raw.readinto(target)
+            if not n:
+                break
+            if self._file_view is None:
+                _write_at(fd, target[:n], offset)
+            yield offset, target[:n]
+            offset += n
+        # Unlike urllib3, http.client's readinto() signals a body cut short by
+        # returning 0 rather than raising, so check for that here.
+        if offset <= end:
+            raise http.client.IncompleteRead(b'', end + 1 - offset)
+        # urllib3 did not see the body being read, so hand the connection back
+        # to the pool ourselves once it is drained.
+        if raw.isclosed():
+            response.raw.release_conn()
+
+    def _hash_in_order(self, chunk, offset):
+        """Hashes a chunk straight from memory if it starts exactly where the hash has got to."""
+        with self._hash_lock:
+            if self._hashed == offset:
+                self._hasher.update(chunk)
+                self._hashed += len(chunk)
+
+    def _contiguous_bytes(self, first=0):
+        """
+        Returns the index of the first unfinished segment at or after `first`,
+        and how many bytes at the start of the file have been fully written.
+        """
+        for index in range(first, len(self._segments)):
+            start, end, done = self._segments[index]
+            if done < end - start + 1:
+                return index, start + done
+        return len(self._segments), self.total_size
+
+    def _hash_while_downloading(self, part_file):
+        """
+        Keeps the hash moving front to back while segments download. Chunks
+        written at the hash position are hashed from memory by the thread that
+        received them; this thread reads from the file whatever they could not
+        cover, i.e. data that arrived before the bytes in front of it.
+        """
+        dropped = 0
+        first = 0
+        try:
+            with open(part_file, 'rb') as f_in, mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                _advise_sequential(f_in.fileno())
+                view = memoryview(mm)
+                try:
+                    while self._hashed < self.total_size and not self.stop_event.is_set():
+                        with self._progress_cv:
+                            finished = self._done_count == self._worker_count
+                            first, available = self._contiguous_bytes(first)
+                            if available <= self._hashed:
+                                if finished:
+                                    break
+                                self._progress_cv.wait(timeout=0.5)
+                                continue
+                        with self._hash_lock:
+                            if available > self._hashed:
+                                self._hasher.update(view[self._hashed:available])
+                                self._hashed = available
+                        hashed = self._hashed
+
+                        # Unmapping must start on a page boundary; the partial
+                        # last page is released with the next step.
+                        release_to = hashed - hashed % mmap.PAGESIZE
+                        if release_to - dropped >= CACHE_DROP_SIZE:
+                            self._drop_hashed(f_in.fileno(), mm, dropped, release_to)
+                            dropped = release_to
+                    # The rest, including data the segment threads hashed
+                    # themselves after this thread last looked.
+                    if self._hashed > dropped:
+                        self._drop_hashed(f_in.fileno(), mm, dropped, self._hashed)
+                finally:
+                    view.release()
+        except (OSError, ValueError) as e:
+            self._hash_error = e
+
+    def _hash_file(self, path):
+        """Feeds a file on disk into the running hash in a single update call."""
+        with open(path, 'rb') as f_in:
+            size = os.fstat(f_in.fileno()).st_size
+            if size == 0:
+                return
+            _advise_sequential(f_in.fileno())
+            with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                self._hasher.update(mm)
+                self._hashed += size
+                _drop_from_cache(f_in.fileno(), mm, 0, size)
 
     def _verify_file_integrity(self):
-        """Verifies the integrity of the downloaded file using SHA-256."""
+        """Reports the hash computed while the file was being written."""
         print("\nVerifying file integrity...")
-        try:
-            hasher = hashlib.sha256()
-            with open(self.output_path, 'rb') as f:
-                while chunk := f.read(8192):
-                    hasher.update(chunk)
-            file_hash = hasher.hexdigest()
-            print(f"File verification successful. SHA-256: {file_hash}")
-        except IOError as e:
-            print(f"\nFile verification error: {e}")
+        if self._hash_error:
+            print(f"\nFile verification error: {self._hash_error}")
+            return
+        if self.total_size and self._hashed != self.total_size:
+            print(f"\nFile verification error: only {self._hashed} of {self.total_size} bytes were hashed.")
+            return
+        file_hash = self._hasher.hexdigest()
+        print(f"File verification successful. {HASH_ALGORITHMS[self.hash_algorithm]}: {file_hash}")
 
 def main():
     """Main function to run the CLI application."""
@@ -234,8 +730,14 @@ def main():
     parser.add_argument("url", help="The URL of the file to be downloaded.")
     parser.add_argument("directory", nargs='?', default=None, help="The directory to save the file in (optional).")
     parser.add_argument("-t", "--threads", type=int, default=8, help="Number of threads to use for multi-threaded downloading.")
+    parser.add_argument("--hash", choices=HASH_ALGORITHMS, default='blake3', help="Hash algorithm used to verify the downloaded file (default: blake3).")
+    parser.add_argument("--socket-buffer", type=int, default=None, help="Socket receive buffer size in bytes for each connection (default: tuned by the OS).")
     
     args = parser.parse_args()
+    if args.threads < 1:
+        parser.error("--threads must be at least 1")
+    if args.socket_buffer is not None and args.socket_buffer < 1:
+        parser.error("--socket-buffer must be at least 1")
 
     download_dir = get_download_path(args.directory)
     filename = get_filename_from_url(args.url)
@@ -248,7 +750,7 @@ def main():
             sys.exit(0)
 
     print(f"Starting download of '{args.url}' to '{output_path}'")
-    downloader = Downloader(args.url, output_path, num_threads=args.threads)
+    downloader = Downloader(args.url, output_path, num_threads=args.threads, socket_buffer=args.socket_buffer, hash_algorithm=args.hash)
     downloader.download()
 
 if __name__ == "__main__":
@@ -6,6 +6,7 @@ setup(
     py_modules=["download_app"],
     install_requires=[
         "requests",
+        "blake3",
     ],
     entry_points={
         "console_scripts": [